@@ -6,7 +6,9 @@ import json
 
 # Import utility modules
 from utils.firebase_utils import login_user, save_core_values, get_core_values, save_test, get_company_name
-from utils.llm_interface import generate_questions
+from utils.prefetch import QuestionPrefetcher, DEFAULT_NUM_QUESTIONS
+from utils.metering import UsageMeter, GenerationScheduler, metered_generate_questions
+from utils.models import CoreValue
 
 # Load environment variables
 load_dotenv()
@@ -28,6 +30,31 @@ if 'test_data' not in st.session_state:
 if "page" not in st.session_state:
     st.session_state.page = "login"
 
+# Token metering and fair-share scheduling shared by every session in this server
+@st.cache_resource
+def get_scheduler():
+    return GenerationScheduler(UsageMeter())
+
+# Opt-in background generation of the default test whenever core values are saved
+@st.cache_resource
+def get_prefetcher():
+    if os.getenv("PREFETCH_QUESTIONS", "").lower() in ("1", "true", "yes"):
+        return QuestionPrefetcher(scheduler=get_scheduler())
+    return None
+
+# Usage and budgets are keyed by the company document ID (companies/{user_id}),
+# never by the display name, which is not unique
+def company_id(user_id):
+    return user_id
+
+def prefetch_questions(user_id, core_values):
+    prefetcher = get_prefetcher()
+    if prefetcher:
+        prefetcher.start(
+            user_id, core_values, DEFAULT_NUM_QUESTIONS,
+            company=company_id(user_id), company_name=st.session_state.get("company")
+        )
+
 # Main function
 def main():
     """Main function to run the Streamlit app."""
@@ -55,6 +82,7 @@ def login_page():
         user = login_user(email, password)
         if user:
             st.session_state.user = user
+            st.session_state.company = cached_company_name(user.get("localId"), user.get("idToken"))
             st.session_state.page = "core_values"
             st.success("Login successful!")
             st.rerun()
@@ -64,6 +92,11 @@ def login_page():
     # Register link
     st.markdown("Don't have an account? [Register here](https://akxyn.github.io/core-values/auth.html)")
 
+# Company names rarely change, so don't read them from Firestore on every rerun
+@st.cache_data(ttl=600, show_spinner=False)
+def cached_company_name(user_id, _id_token):
+    return get_company_name(user_id, _id_token)
+
 # Core values page
 def core_values_page():
     st.subheader("Define Your Core Values")
@@ -76,23 +109,65 @@ def core_values_page():
     if not st.session_state.core_values:
         st.session_state.core_values = get_core_values(user_id, id_token)
     
-    # Display existing core values
-    if st.session_state.core_values:
+    core_value_list(user_id, id_token)
+    core_value_form(user_id, id_token)
+    
+    # Navigation buttons
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Back to Login"):
+            st.session_state.user = None
+            st.session_state.page = "login"
+            st.rerun()
+    with col2:
+        if st.button("Generate Test"):
+            # Ensure core values are saved before proceeding
+            if save_core_values(user_id, st.session_state.core_values, id_token):
+                prefetch_questions(user_id, st.session_state.core_values)
+                st.session_state.page = "test_generation"
+                st.rerun()
+            else:
+                st.error("Failed to save core values. Please try again before proceeding.")
+
+def delete_core_value(user_id, id_token):
+    """Delete button callback; runs before the list fragment re-renders."""
+    index = st.session_state.pop("core_value_to_delete", None)
+    if index is None or index >= len(st.session_state.core_values):
+        return
+    removed = st.session_state.core_values.pop(index)
+    if save_core_values(user_id, st.session_state.core_values, id_token):
+        prefetch_questions(user_id, st.session_state.core_values)
+    else:
+        st.session_state.core_values.insert(index, removed)
+        st.session_state.delete_failed = True
+
+# Fragments rerun on their own when one of their widgets changes, instead of
+# rerunning the whole page
+@st.fragment
+def core_value_list(user_id, id_token):
+    # Display existing core values as one element, with a single delete control,
+    # so a rerun doesn't send a row of widgets per core value
+    core_values = st.session_state.core_values
+    if core_values:
         st.write("Your current core values:")
-        for i, value in enumerate(st.session_state.core_values):
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.write(f"**{value['name']}**: {value['description']}")
-            with col2:
-                if st.button("Delete", key=f"delete_{i}"):
-                    st.session_state.core_values.pop(i)
-                    if save_core_values(user_id, st.session_state.core_values, id_token):
-                        st.rerun()
-                    else:
-                        st.error("Failed to delete core value. Please try again.")
+        st.markdown("\n".join(f"- **{value.name}**: {value.description}" for value in core_values))
+        col1, col2 = st.columns([3, 1])
+        col1.selectbox(
+            "Core value to delete",
+            range(len(core_values)),
+            format_func=lambda i: core_values[i].name,
+            key="core_value_to_delete",
+            label_visibility="collapsed"
+        )
+        col2.button("Delete", on_click=delete_core_value, args=(user_id, id_token))
     else:
         st.info("No core values found. Please add some below.")
     
+    if st.session_state.pop("delete_failed", False):
+        st.error("Failed to delete core value. Please try again.")
+
+@st.fragment
+def core_value_form(user_id, id_token):
     # Add new core value
     st.write("Add a new core value:")
     with st.form("core_value_form", clear_on_submit=True):
@@ -101,33 +176,16 @@ def core_values_page():
         submit_button = st.form_submit_button("Add Core Value")
     
     if submit_button and name and description:
-        new_core_value = {
-            "name": name,
-            "description": description
-        }
+        new_core_value = CoreValue(name, description)
         st.session_state.core_values.append(new_core_value)
         if save_core_values(user_id, st.session_state.core_values, id_token):
+            prefetch_questions(user_id, st.session_state.core_values)
+            # Rerun the whole page so the list fragment shows the new value
             st.rerun()
         else:
             st.error("Failed to save core value. Please try again.")
             # Remove the core value from session state if save failed
             st.session_state.core_values.pop()
-    
-    # Navigation buttons
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("Back to Login"):
-            st.session_state.user = None
-            st.session_state.page = "login"
-            st.rerun()
-    with col2:
-        if st.button("Generate Test"):
-            # Ensure core values are saved before proceeding
-            if save_core_values(user_id, st.session_state.core_values, id_token):
-                st.session_state.page = "test_generation"
-                st.rerun()
-            else:
-                st.error("Failed to save core values. Please try again before proceeding.")
 
 # Test generation page
 def test_generation_page():
@@ -142,15 +200,41 @@ def test_generation_page():
     id_token = st.session_state.user.get("idToken")
     
     # Get company name from Firestore
-    company_name = get_company_name(user_id, id_token)
+    company_name = cached_company_name(user_id, id_token)
     
     st.title("Generate Test")
     
+    generation_panel(user_id, id_token, company_name)
+    
+    # Navigation buttons
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Back to Core Values"):
+            st.session_state.test_result = None
+            st.session_state.page = "core_values"
+            st.rerun()
+    with col2:
+        if st.button("Logout"):
+            for key in list(st.session_state.keys()):
+                del st.session_state[key]
+            st.rerun()
+
+def test_json(test_data):
+    """JSON download payload for a generated test."""
+    return json.dumps({
+        **test_data,
+        "core_values": [cv.to_dict() for cv in test_data["core_values"]],
+        "questions": [q.to_dict() for q in test_data["questions"]]
+    }, indent=2)
+
+@st.fragment
+def generation_panel(user_id, id_token, company_name):
     # Get test name and number of questions
     test_name = st.text_input("Test Name", "Core Values Assessment")
-    num_questions = st.number_input("Number of Questions", min_value=5, max_value=20, value=10)
+    num_questions = st.number_input("Number of Questions", min_value=5, max_value=20, value=DEFAULT_NUM_QUESTIONS)
     
     if st.button("Generate Test"):
+        st.session_state.test_result = None
         with st.spinner("Generating test questions..."):
             # Get core values from the database
             core_values = get_core_values(user_id, id_token)
@@ -159,8 +243,18 @@ def test_generation_page():
                 st.error("Please add core values first.")
                 return
             
+            # Use the background generation if it was started for these exact inputs
+            prefetcher = get_prefetcher()
+            prefetched = prefetcher.take(user_id, core_values, num_questions) if prefetcher else None
+            
             # Generate test questions
-            questions, error_msg = generate_questions(core_values, num_questions)
+            if prefetched:
+                questions, error_msg = prefetched
+            else:
+                questions, error_msg = metered_generate_questions(
+                    get_scheduler(), user_id, company_id(user_id), core_values, num_questions,
+                    company_name=company_name
+                )
             
             if error_msg:
                 st.error("⚠️ Unable to generate questions at this time. Please try again later or contact support.")
@@ -182,33 +276,45 @@ def test_generation_page():
             
             if test_id:
                 st.session_state.test_data = test_data  # Store test data in session state
-                st.success("Test generated successfully!")
-                st.info("Please refresh your dashboard to see the new test.")
-                
-                # Add button to view in dashboard
-                st.link_button("View in Dashboard", "https://akxyn.github.io/core-values/dashboard.html")
-                
-                # Download button inside success block
-                st.download_button(
-                    "Download Test as JSON",
-                    data=json.dumps(test_data, indent=2),
-                    file_name=f"{test_name.lower().replace(' ', '_')}.json",
-                    mime="application/json"
-                )
+                # Keep the result on screen across panel reruns, e.g. after downloading
+                st.session_state.test_result = {
+                    "test_data": test_data,
+                    "file_name": f"{test_name.lower().replace(' ', '_')}.json"
+                }
             else:
                 st.error("Failed to save test. Please try again.")
     
-    # Navigation buttons
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("Back to Core Values"):
-            st.session_state.page = "core_values"
-            st.rerun()
-    with col2:
-        if st.button("Logout"):
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
-            st.rerun()
+    result = st.session_state.get("test_result")
+    if result:
+        st.success("Test generated successfully!")
+        st.info("Please refresh your dashboard to see the new test.")
+        
+        # Add button to view in dashboard
+        st.link_button("View in Dashboard", "https://akxyn.github.io/core-values/dashboard.html")
+        
+        # The JSON payload is only built, and never kept, when the user asks for it
+        if st.button("Prepare JSON Download"):
+            st.download_button(
+                "Download Test as JSON",
+                data=test_json(result["test_data"]),
+                file_name=result["file_name"],
+                mime="application/json"
+            )
+    
+    # Generation usage for this company
+    with st.expander("Usage"):
+        scheduler = get_scheduler()
+        tenant = company_id(user_id)
+        usage = scheduler.meter.summary(tenant)
+        budget = scheduler.budget_for(tenant)
+        if budget:
+            used = scheduler.meter.tokens_in_window(tenant)
+            st.write(f"Token budget: {used} of {budget} used in the current window")
+        if usage["companies"]:
+            st.table(usage["companies"])
+            st.table(usage["users"])
+        else:
+            st.write("No generations recorded yet.")
 
 if __name__ == "__main__":
     main()
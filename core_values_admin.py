@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import requests
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.firebase_utils import FIREBASE_CONFIG, FIREBASE_FIRESTORE_URL, login_user
+from utils.models import CoreValue
+
+READ_BATCH_SIZE = 100
+# Firestore accepts up to 500 writes per commit
+WRITE_BATCH_SIZE = 500
+
+DOCUMENT_ROOT = f"projects/{FIREBASE_CONFIG['projectId']}/databases/(default)/documents"
+
+DEFAULT_SEED_VALUES = [CoreValue("Test Core Value", "This is a test core value")]
+
+# Error statuses Firestore returns when a write's currentDocument precondition fails
+CONFLICT_STATUSES = ("FAILED_PRECONDITION", "ALREADY_EXISTS")
+
+
+def core_values_document(user_id):
+    """Full Firestore resource name of a user's core values document."""
+    return f"{DOCUMENT_ROOT}/users/{user_id}/core_values/core_values"
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def error_status(response):
+    """Firestore error status (e.g. "FAILED_PRECONDITION") of a failed response, if any."""
+    try:
+        return response.json().get("error", {}).get("status")
+    except (ValueError, AttributeError):
+        return None
+
+
+def classify(document):
+    """
+    Classify a core values document.
+
+    Returns:
+        str: "missing", "empty", "legacy" (only stringValue entries),
+             "mixed" (stringValue and mapValue entries) or "ok"
+    """
+    if document is None:
+        return "missing"
+    values = document.get("fields", {}).get("values", {}).get("arrayValue", {}).get("values", [])
+    if not values:
+        return "empty"
+    legacy = sum(1 for value in values if "mapValue" not in value)
+    if legacy == len(values):
+        return "legacy"
+    if legacy:
+        return "mixed"
+    return "ok"
+
+
+class Throughput:
+    """Thread-safe counters for documents read and written."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.reads = 0
+        self.writes = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def add(self, reads=0, writes=0):
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.requests += 1
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        print(f"\n{self.reads} documents read, {self.writes} written in {self.requests} requests "
+              f"over {elapsed:.2f}s ({self.reads / elapsed:.1f} reads/s, {self.writes / elapsed:.1f} writes/s)")
+
+
+class CoreValuesAdmin:
+    """Audits, seeds and migrates core values documents for many users at once."""
+
+    def __init__(self, token, workers=8, dry_run=False):
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        self.workers = workers
+        self.dry_run = dry_run
+        self.throughput = Throughput()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _batch_get(self, user_ids):
+        try:
+            response = self.session.post(
+                f"{FIREBASE_FIRESTORE_URL}:batchGet",
+                headers=self.headers,
+                json={"documents": [core_values_document(user_id) for user_id in user_ids]},
+                timeout=60
+            )
+            if response.status_code != 200:
+                print(f"Read of {len(user_ids)} documents failed ({response.status_code}): {response.text[:200]}")
+                self.throughput.add()
+                return {}
+            items = response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Read of {len(user_ids)} documents failed: {e}")
+            self.throughput.add()
+            return {}
+        self.throughput.add(reads=len(user_ids))
+
+        documents = {}
+        for item in items:
+            if "found" in item:
+                documents[item["found"]["name"]] = item["found"]
+        return {user_id: documents.get(core_values_document(user_id)) for user_id in user_ids}
+
+    def fetch(self, user_ids):
+        """
+        Read every user's core values document with concurrent batchGet calls.
+
+        A failed batchGet is reported and its users are left out of the
+        result, so they are skipped rather than mistaken for missing documents.
+
+        Returns:
+            dict: User ID -> Firestore document, or None if it does not exist
+        """
+        result = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for documents in pool.map(self._batch_get, chunks(user_ids, READ_BATCH_SIZE)):
+                result.update(documents)
+        if len(result) < len(user_ids):
+            print(f"{len(user_ids) - len(result)} of {len(user_ids)} users could not be read and are skipped")
+        return result
+
+    def _commit(self, writes):
+        try:
+            response = self.session.post(
+                f"{FIREBASE_FIRESTORE_URL}:commit",
+                headers=self.headers,
+                json={"writes": writes},
+                timeout=60
+            )
+        except requests.RequestException as e:
+            print(f"Commit of {len(writes)} writes failed: {e}")
+            self.throughput.add()
+            return 0
+        if response.status_code == 200:
+            self.throughput.add(writes=len(writes))
+            return len(writes)
+        self.throughput.add()
+
+        if error_status(response) in CONFLICT_STATUSES:
+            if len(writes) == 1:
+                user_id = writes[0]["update"]["name"].rsplit("/users/", 1)[-1].split("/")[0]
+                print(f"Skipped {user_id}: document changed since it was read")
+                return 0
+            # A commit is atomic, so one conflicting document fails the whole
+            # batch. Retry each half to isolate it and write everything else.
+            middle = len(writes) // 2
+            return self._commit(writes[:middle]) + self._commit(writes[middle:])
+
+        print(f"Commit of {len(writes)} writes failed ({response.status_code}): {response.text[:200]}")
+        return 0
+
+    def write(self, updates):
+        """
+        Write core values for many users in concurrent :commit batches.
+
+        Each write is conditional on the document being unchanged since it was
+        read, so a concurrent save in the app is never overwritten. A batch
+        that fails on such a conflict is split and retried until only the
+        conflicting documents are left out. Re-running the command picks up
+        anything that was skipped.
+
+        Args:
+            updates (list): (user_id, document or None, list of CoreValue) tuples
+
+        Returns:
+            int: Number of documents written
+        """
+        writes = []
+        for user_id, document, core_values in updates:
+            write = {
+                "update": {
+                    "name": core_values_document(user_id),
+                    "fields": {
+                        "values": {"arrayValue": {"values": [cv.to_firestore() for cv in core_values]}},
+                        "lastUpdated": {"timestampValue": datetime.now().isoformat() + "Z"}
+                    }
+                },
+                "updateMask": {"fieldPaths": ["values", "lastUpdated"]}
+            }
+            if document is None:
+                write["currentDocument"] = {"exists": False}
+            else:
+                write["currentDocument"] = {"updateTime": document["updateTime"]}
+            writes.append(write)
+
+        if self.dry_run:
+            for user_id, _, core_values in updates:
+                print(f"[dry run] {user_id}: {json.dumps([cv.to_dict() for cv in core_values])}")
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return sum(pool.map(self._commit, chunks(writes, WRITE_BATCH_SIZE)))
+
+    def audit(self, user_ids, verbose=False):
+        """
+        Classify every user's core values document.
+
+        Returns:
+            dict: User ID -> classification (see classify)
+        """
+        documents = self.fetch(user_ids)
+        statuses = {user_id: classify(documents[user_id]) for user_id in user_ids if user_id in documents}
+
+        counts = {}
+        for user_id, status in statuses.items():
+            counts[status] = counts.get(status, 0) + 1
+            if verbose or status != "ok":
+                print(f"{user_id}: {status}")
+        print("\nSummary: " + ", ".join(f"{status}={count}" for status, count in sorted(counts.items())))
+        return statuses
+
+    def seed(self, user_ids, core_values):
+        """Write core values for users whose document is missing or empty."""
+        documents = self.fetch(user_ids)
+        updates = [
+            (user_id, documents[user_id], core_values)
+            for user_id in user_ids
+            if user_id in documents and classify(documents[user_id]) in ("missing", "empty")
+        ]
+        print(f"{len(updates)} of {len(user_ids)} users need seeding")
+        written = self.write(updates)
+        if not self.dry_run:
+            print(f"Seeded {written} documents")
+        return written
+
+    def migrate(self, user_ids):
+        """Rewrite legacy stringValue core values as mapValue entries."""
+        documents = self.fetch(user_ids)
+        updates = []
+        for user_id in user_ids:
+            document = documents.get(user_id)
+            if user_id in documents and classify(document) in ("legacy", "mixed"):
+                values = document["fields"]["values"]["arrayValue"]["values"]
+                updates.append((user_id, document, [CoreValue.from_firestore(value) for value in values]))
+        print(f"{len(updates)} of {len(user_ids)} users need migrating")
+        written = self.write(updates)
+        if not self.dry_run:
+            print(f"Migrated {written} documents")
+        return written
+
+
+def read_user_ids(path):
+    """Read user IDs, one per line, from a file or '-' for stdin."""
+    handle = sys.stdin if path == "-" else open(path)
+    try:
+        user_ids = [line.strip() for line in handle if line.strip() and not line.startswith("#")]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    # Keep the first occurrence of each user so batches don't contain duplicates
+    return list(dict.fromkeys(user_ids))
+
+
+def read_core_values(path):
+    if not path:
+        return DEFAULT_SEED_VALUES
+    with open(path) as f:
+        return [CoreValue.from_dict(item) for item in json.load(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk audit, seed and migrate users' core values documents.")
+    parser.add_argument("command", choices=["audit", "seed", "migrate"])
+    parser.add_argument("--users", required=True, help="File with one user ID per line, or '-' for stdin")
+    parser.add_argument("--values", help="JSON file with [{\"name\", \"description\"}] to seed (default: a test value)")
+    parser.add_argument("--token", default=os.getenv("FIRESTORE_ACCESS_TOKEN"),
+                        help="OAuth access token or Firebase ID token (default: $FIRESTORE_ACCESS_TOKEN)")
+    parser.add_argument("--email", help="Sign in with this account instead of passing a token")
+    parser.add_argument("--password", help="Password for --email")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent batchGet/commit requests")
+    parser.add_argument("--dry-run", action="store_true", help="Show the writes without committing them")
+    parser.add_argument("--verbose", action="store_true", help="List every user in audit output")
+    args = parser.parse_args()
+
+    token = args.token
+    if args.email:
+        user = login_user(args.email, args.password or "")
+        token = user.get("idToken") if user else None
+    if not token:
+        parser.error("an access token is required (--token, $FIRESTORE_ACCESS_TOKEN or --email/--password)")
+
+    user_ids = read_user_ids(args.users)
+    admin = CoreValuesAdmin(token, workers=args.workers, dry_run=args.dry_run)
+
+    if args.command == "audit":
+        admin.audit(user_ids, verbose=args.verbose)
+    elif args.command == "seed":
+        admin.seed(user_ids, read_core_values(args.values))
+    elif args.command == "migrate":
+        admin.migrate(user_ids)
+
+    admin.throughput.report()
+
+
+if __name__ == "__main__":
+    main()
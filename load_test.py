@@ -0,0 +1,491 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+
+class StubBackend:
+    """
+    In-memory stand-in for Firebase Auth, Firestore and the inference API.
+
+    Only the endpoints used by utils.firebase_utils and utils.llm_interface
+    are implemented. The inference endpoint sleeps for `llm_delay` seconds
+    to mimic the blocking LLM call.
+    """
+
+    def __init__(self, llm_delay=2.0, firestore_delay=0.0):
+        self.llm_delay = llm_delay
+        self.firestore_delay = firestore_delay
+        self.documents = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def start(self, host="127.0.0.1", port=0):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                backend.handle(self, "GET")
+
+            def do_POST(self):
+                backend.handle(self, "POST")
+
+            def do_PATCH(self):
+                backend.handle(self, "PATCH")
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def handle(self, request, method):
+        length = int(request.headers.get("Content-Length") or 0)
+        body = json.loads(request.rfile.read(length)) if length else {}
+        path = request.path.split("?")[0]
+
+        if path.endswith("accounts:signInWithPassword"):
+            email = body.get("email", "")
+            status, payload = 200, {
+                "localId": email.split("@")[0] or uuid.uuid4().hex,
+                "email": email,
+                "idToken": "stub-token-" + uuid.uuid4().hex,
+            }
+        elif path.startswith("/models/"):
+            time.sleep(self.llm_delay)
+            status, payload = 200, [{"generated_text": json.dumps(self.questions(body))}]
+        elif "/documents/" in path:
+            time.sleep(self.firestore_delay)
+            status, payload = self.firestore(method, path.split("/documents/", 1)[1], body)
+        else:
+            status, payload = 404, {"error": "not found"}
+
+        data = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.end_headers()
+        request.wfile.write(data)
+
+    def firestore(self, method, doc_path, body):
+        with self.lock:
+            if method == "POST":
+                doc_path = f"{doc_path}/{uuid.uuid4().hex}"
+                self.documents[doc_path] = body
+                return 200, {"name": f"projects/stub/databases/(default)/documents/{doc_path}", **body}
+            if method == "PATCH":
+                self.documents[doc_path] = body
+                return 200, {"name": doc_path, **body}
+            if doc_path.startswith("companies/"):
+                return 200, {"fields": {"name": {"stringValue": "Load Test Co"}}}
+            if doc_path in self.documents:
+                return 200, self.documents[doc_path]
+            return 404, {"error": {"code": 404, "status": "NOT_FOUND"}}
+
+    def questions(self, body):
+        prompt = body.get("inputs", "")
+        try:
+            num_questions = int(prompt.split("Generate ", 1)[1].split(" ", 1)[0])
+        except (IndexError, ValueError):
+            num_questions = 10
+        return [
+            {
+                "id": i + 1,
+                "text": f"Load test question {i + 1}?",
+                "core_values": ["Load"],
+                "options": [{"text": f"Option {s}", "score": s} for s in (8, 6, 4, 2)],
+            }
+            for i in range(num_questions)
+        ]
+
+
+class AppServer:
+    """A `streamlit run app.py` subprocess wired to the stub backend."""
+
+    def __init__(self, backend_address, verbose=False):
+        self.backend_address = backend_address
+        self.verbose = verbose
+        self.process = None
+        self.workdir = None
+        self.port = None
+
+    def start(self, timeout=60):
+        # Secrets are read from .streamlit/secrets.toml in the working directory
+        self.workdir = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.workdir.name, ".streamlit"))
+        with open(os.path.join(self.workdir.name, ".streamlit", "secrets.toml"), "w") as f:
+            f.write('[secrets]\nHF_API_KEY = "stub"\n')
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+
+        env = dict(os.environ)
+        env["FIREBASE_AUTH_EMULATOR_HOST"] = self.backend_address
+        env["FIRESTORE_EMULATOR_HOST"] = self.backend_address
+        env["HF_API_URL"] = f"http://{self.backend_address}/models/stub"
+
+        output = None if self.verbose else subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "streamlit", "run", APP_PATH,
+                "--server.headless", "true",
+                "--server.address", "127.0.0.1",
+                "--server.port", str(self.port),
+                "--server.fileWatcherType", "none",
+                "--browser.gatherUsageStats", "false",
+            ],
+            cwd=self.workdir.name,
+            env=env,
+            stdout=output,
+            stderr=output,
+        )
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if requests.get(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1).ok:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError("Streamlit server did not become healthy in time")
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+            self.process = None
+        if self.workdir:
+            self.workdir.cleanup()
+            self.workdir = None
+
+    def rss_kb(self):
+        """Resident set size of the server process in KiB (Linux only)."""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+
+class HeadlessSession:
+    """
+    Minimal Streamlit websocket client.
+
+    It keeps the widgets rendered by the latest completed script run and
+    sends widget states back the way the browser does, so interactions go
+    through the same rerun path as a real user.
+    """
+
+    def __init__(self, port, timeout):
+        self.url = f"ws://127.0.0.1:{port}/_stcore/stream"
+        self.timeout = timeout
+        self.connection = None
+        self.widgets = []
+        self.values = {}
+        self.cache = {}
+        self.texts = []
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+        self.connection = await websocket_connect(self.url, subprotocols=["streamlit"])
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+
+    async def rerun(self, triggers=(), fragment_id=""):
+        """Send a rerun request and wait until the script settles."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.SetInParent()
+        if fragment_id:
+            msg.rerun_script.fragment_id = fragment_id
+        states = msg.rerun_script.widget_states
+        for widget in self.widgets:
+            state = self.values.get(widget["id"])
+            if state is not None:
+                states.widgets.add().CopyFrom(state)
+        for widget_id in triggers:
+            states.widgets.add(id=widget_id, trigger_value=True)
+        await self.connection.write_message(msg.SerializeToString(), binary=True)
+
+        widgets, texts = [], []
+        while True:
+            raw = await asyncio.wait_for(self.connection.read_message(), self.timeout)
+            if raw is None:
+                raise RuntimeError("Server closed the connection")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            if forward.WhichOneof("type") == "ref_hash":
+                forward = self.cache[forward.ref_hash]
+            elif forward.hash:
+                self.cache[forward.hash] = forward
+
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":
+                # A fragment run only replaces the elements of the fragments it reruns
+                fragments = set(getattr(forward.new_session, "fragment_ids_this_run", []))
+                widgets = [w for w in self.widgets if fragments and w["fragment"] not in fragments]
+                texts = [t for t in self.texts if fragments and t[0] not in fragments]
+            elif kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                fragment = getattr(forward.delta, "fragment_id", "")
+                self.collect(forward.delta.new_element, fragment, widgets, texts)
+            elif kind == "script_finished":
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                self.widgets, self.texts = widgets, texts
+                return
+
+    def collect(self, element, fragment, widgets, texts):
+        kind = element.WhichOneof("type")
+        proto = getattr(element, kind)
+        if kind == "exception":
+            raise RuntimeError(f"App raised {proto.type}: {proto.message}")
+        if kind == "alert":
+            texts.append((fragment, proto.body))
+        if getattr(proto, "id", ""):
+            widgets.append({
+                "id": proto.id, "kind": kind, "label": getattr(proto, "label", ""), "fragment": fragment
+            })
+
+    def find_widget(self, label, kind=None):
+        for widget in self.widgets:
+            if widget["label"] == label and (kind is None or widget["kind"] == kind):
+                return widget
+        raise RuntimeError(f"Widget '{label}' not found")
+
+    def find(self, label, kind=None):
+        return self.find_widget(label, kind)["id"]
+
+    def has_text(self, text):
+        return any(body == text for _, body in self.texts)
+
+    def set_text(self, label, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id = self.find(label)
+        self.values[widget_id] = WidgetState(id=widget_id, string_value=value)
+
+    def set_int(self, label, value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        widget_id = self.find(label)
+        self.values[widget_id] = WidgetState(id=widget_id, int_value=value)
+
+    async def click(self, label):
+        # Like the browser, only rerun the fragment that owns the button
+        widget = self.find_widget(label, "button")
+        await self.rerun(triggers=[widget["id"]], fragment_id=widget["fragment"])
+
+
+async def run_session(port, email, num_questions, timeout):
+    """
+    Drive one simulated session through login -> core values -> test generation.
+
+    The stub backend derives the user ID from `email`, so a fresh address
+    starts from an empty core values list.
+
+    Returns:
+        dict: Per-step rerun latencies in seconds and any error message
+    """
+    timings = {}
+    session = HeadlessSession(port, timeout)
+
+    async def step(name, action):
+        start = time.perf_counter()
+        await action
+        timings[name] = time.perf_counter() - start
+
+    try:
+        await session.connect()
+        await step("initial_load", session.rerun())
+
+        session.set_text("Email", email)
+        session.set_text("Password", "password")
+        await step("login", session.click("Login"))
+
+        session.set_text("Name", f"Value {email.split('@')[0]}")
+        session.set_text("Description", "A core value created by the load test")
+        await step("add_core_value", session.click("Add Core Value"))
+
+        await step("open_generation", session.click("Generate Test"))
+
+        session.set_int("Number of Questions", num_questions)
+        await step("generate_test", session.click("Generate Test"))
+        if not session.has_text("Test generated successfully!"):
+            raise RuntimeError(f"generate_test: {[body for _, body in session.texts] or 'no result rendered'}")
+
+        return {"timings": timings, "error": None, "session": session}
+    except Exception as e:
+        return {"timings": timings, "error": f"{type(e).__name__}: {e}", "session": session}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_level(server, concurrency, num_questions, timeout):
+    """
+    Run `concurrency` sessions at once and summarise the results.
+
+    Every call logs in as new users, so no level inherits core values (and
+    longer pages) from an earlier one.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    baseline_rss = server.rss_kb()
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        run_session(server.port, f"loadtest-{run_id}-{i}@example.com", num_questions, timeout)
+        for i in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    # Sessions are still connected here, so their state is still resident
+    loaded_rss = server.rss_kb()
+    for result in results:
+        result.pop("session").close()
+
+    reruns = [t for r in results for t in r["timings"].values()]
+    generation = [r["timings"]["generate_test"] for r in results if "generate_test" in r["timings"]]
+    interactive = [
+        t for r in results for name, t in r["timings"].items() if name != "generate_test"
+    ]
+    completed = sum(1 for r in results if not r["error"])
+    return {
+        "concurrency": concurrency,
+        "completed": completed,
+        "errors": [r["error"] for r in results if r["error"]],
+        "elapsed": elapsed,
+        "throughput": completed / elapsed if elapsed else 0.0,
+        "rerun_p50": percentile(reruns, 50),
+        "rerun_p95": percentile(reruns, 95),
+        "interactive_p95": percentile(interactive, 95),
+        "generate_p95": percentile(generation, 95),
+        "memory_per_session_kb": max(0, loaded_rss - baseline_rss) / concurrency,
+    }
+
+
+def find_saturation(levels, min_gain, max_p95):
+    """
+    Return the concurrency at which the server saturates.
+
+    Saturation is the first level that has errors, whose interactive rerun
+    p95 exceeds `max_p95` seconds, or whose throughput improves on the best
+    previous level by less than `min_gain`.
+    """
+    best = None
+    for level in levels:
+        if level["errors"] or level["interactive_p95"] > max_p95:
+            return level["concurrency"]
+        if best and level["throughput"] < best["throughput"] * (1 + min_gain):
+            return level["concurrency"]
+        if not best or level["throughput"] > best["throughput"]:
+            best = level
+    return None
+
+
+def print_report(levels, saturation):
+    print(f"{'sessions':>8} {'done':>5} {'flows/s':>8} {'rerun p50':>10} {'rerun p95':>10} "
+          f"{'ui p95':>8} {'gen p95':>8} {'KiB/sess':>9}")
+    for level in levels:
+        print(f"{level['concurrency']:>8} {level['completed']:>5} {level['throughput']:>8.2f} "
+              f"{level['rerun_p50']:>10.3f} {level['rerun_p95']:>10.3f} "
+              f"{level['interactive_p95']:>8.3f} {level['generate_p95']:>8.3f} "
+              f"{level['memory_per_session_kb']:>9.0f}")
+        for error in level["errors"][:3]:
+            print(f"         error: {error}")
+    if saturation:
+        print(f"\nSaturation point: {saturation} concurrent sessions")
+    else:
+        print("\nNo saturation observed at the tested concurrency levels")
+
+
+def measure_level(backend_address, concurrency, args):
+    """
+    Measure one concurrency level on a freshly started server.
+
+    The process allocator rarely hands freed memory back to the OS, so an RSS
+    delta on a reused server only shows growth beyond the previous level's
+    peak. Each level therefore gets its own server, warmed up with a single
+    session so module imports and caches don't count towards it.
+    """
+    server = AppServer(backend_address, verbose=args.verbose)
+    server.start()
+    try:
+        asyncio.run(run_level(server, 1, args.questions, args.timeout))
+        return asyncio.run(run_level(server, concurrency, args.questions, args.timeout))
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive concurrent sessions through app.py against local Firestore and inference stand-ins."
+    )
+    parser.add_argument("--levels", default="1,2,4,8,16",
+                        help="Comma separated concurrency levels to test")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per generated test")
+    parser.add_argument("--llm-delay", type=float, default=2.0,
+                        help="Seconds the stub inference API blocks per call")
+    parser.add_argument("--firestore-delay", type=float, default=0.0,
+                        help="Seconds the stub Firestore waits per request")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-rerun timeout in seconds")
+    parser.add_argument("--min-gain", type=float, default=0.1,
+                        help="Minimum relative throughput gain before a level counts as saturated")
+    parser.add_argument("--max-p95", type=float, default=1.0,
+                        help="Interactive rerun p95 (seconds) considered saturated")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the Streamlit server output")
+    args = parser.parse_args()
+
+    backend = StubBackend(llm_delay=args.llm_delay, firestore_delay=args.firestore_delay)
+    address = backend.start()
+    print(f"Stub backend on {address}")
+
+    levels = []
+    try:
+        for concurrency in [int(level) for level in args.levels.split(",")]:
+            print(f"Running {concurrency} concurrent session(s)...", flush=True)
+            levels.append(measure_level(address, concurrency, args))
+    finally:
+        backend.stop()
+
+    saturation = find_saturation(levels, args.min_gain, args.max_p95)
+    print()
+    print_report(levels, saturation)
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"levels": levels, "saturation": saturation}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
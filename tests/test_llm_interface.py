@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import llm_interface
+from utils.metering import CallUsage, estimate_tokens
+
+PROMPT = "Generate questions about Integrity"
+QUESTIONS = [{
+    "id": 1,
+    "text": "What do you do?",
+    "core_values": ["Integrity"],
+    "options": [{"text": f"Option {score}", "score": score} for score in (8, 6, 4, 2)],
+}]
+GENERATED_TEXT = json.dumps(QUESTIONS)
+SLOW_DELAY = 5
+
+
+class InferenceServer:
+    """Local inference endpoint answering every request after `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                server.requests += 1
+                time.sleep(server.delay)
+                data = json.dumps([{"generated_text": GENERATED_TEXT}]).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/models/stub"
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    slow, fast = InferenceServer(SLOW_DELAY), InferenceServer(0.2)
+    primary = llm_interface.Backend("primary", slow.url)
+    hedge = llm_interface.Backend("hedge", fast.url)
+    monkeypatch.setattr(llm_interface, "PRIMARY_BACKEND", primary)
+    monkeypatch.setattr(llm_interface, "HEDGE_BACKEND", hedge)
+    monkeypatch.setattr(llm_interface, "HEDGE_ENABLED", True)
+    monkeypatch.setattr(llm_interface, "HEDGE_MIN_DELAY", 0)
+    monkeypatch.setattr(llm_interface, "HEDGE_INITIAL_DELAY", 0.3)
+    yield primary, hedge
+    slow.stop()
+    fast.stop()
+
+
+def llm_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("llm")]
+
+
+def test_histogram_percentile_needs_enough_samples():
+    histogram = llm_interface.LatencyHistogram(min_samples=3)
+    histogram.record(0.4)
+    assert histogram.percentile(90) is None
+    histogram.record(1.5)
+    histogram.record(7)
+    assert histogram.percentile(50) == 2
+    assert histogram.percentile(90) == 8
+
+
+def test_hedge_wins_and_slow_primary_is_aborted(backends):
+    primary, hedge = backends
+    usage = CallUsage()
+
+    start = time.perf_counter()
+    questions = llm_interface._hedged_call(PROMPT, usage)
+    elapsed = time.perf_counter() - start
+
+    assert [q.text for q in questions] == ["What do you do?"]
+    assert elapsed < 2
+    assert hedge.latency.total == 1
+
+    # The aborted primary unwinds long before the slow server would answer
+    deadline = time.monotonic() + 2
+    while llm_threads() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not llm_threads()
+    assert primary.latency.total == 0
+
+    assert usage.requests == 2
+    assert usage.input_tokens == 2 * estimate_tokens(PROMPT)
+    assert usage.output_tokens == estimate_tokens(GENERATED_TEXT)
+
+
+def test_cancelled_request_raises_request_cancelled(backends):
+    primary, _ = backends
+    session, adapter = llm_interface._cancellable_session()
+    threading.Timer(0.3, adapter.cancel).start()
+    start = time.perf_counter()
+    with pytest.raises(llm_interface.RequestCancelled):
+        llm_interface._call_backend(primary, PROMPT, session)
+    assert time.perf_counter() - start < 2
+    session.close()
@@ -0,0 +1,180 @@
+import threading
+import time
+
+import pytest
+
+from utils.metering import (
+    BudgetExceeded, CallUsage, GenerationScheduler, UsageMeter, estimate_tokens, parse_budgets
+)
+
+TIMEOUT = 2
+
+
+def usage(tokens):
+    call = CallUsage()
+    call.input_tokens = tokens
+    call.requests = 1
+    return call
+
+
+class Holder(threading.Thread):
+    """Holds a scheduler slot from admission until released."""
+
+    def __init__(self, scheduler, company):
+        super().__init__(daemon=True)
+        self.scheduler = scheduler
+        self.company = company
+        self.admitted = threading.Event()
+        self.release = threading.Event()
+        self.error = None
+
+    def run(self):
+        try:
+            with self.scheduler.slot(self.company):
+                self.admitted.set()
+                self.release.wait(TIMEOUT)
+        except Exception as e:
+            self.error = e
+            self.admitted.set()
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def queued(scheduler, count):
+    with scheduler._condition:
+        return len(scheduler._waiting) == count
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abc") == 1
+    assert estimate_tokens("a" * 400) == 100
+
+
+def test_meter_summary_is_limited_to_one_company():
+    meter = UsageMeter()
+    meter.record("u1", "c1", usage(10), 1.0)
+    meter.record("u2", "c2", usage(20), 1.0)
+    summary = meter.summary("c1")
+    assert [row["company"] for row in summary["companies"]] == ["c1"]
+    assert [row["user_id"] for row in summary["users"]] == ["u1"]
+    assert summary["companies"][0]["tokens_in_window"] == 10
+
+
+def test_companies_with_the_same_name_are_kept_apart():
+    meter = UsageMeter()
+    meter.record("u1", "company-1", usage(10), 1.0, company_name="Acme")
+    meter.record("u2", "company-2", usage(20), 1.0, company_name="Acme")
+    assert meter.tokens_in_window("company-1") == 10
+    summary = meter.summary("company-1")
+    assert [(row["company"], row["name"]) for row in summary["companies"]] == [("company-1", "Acme")]
+    assert [row["user_id"] for row in summary["users"]] == ["u1"]
+
+
+def test_company_budgets_override_the_default():
+    meter = UsageMeter()
+    scheduler = GenerationScheduler(
+        meter, token_budget=100, company_budgets=parse_budgets("big=1000, unlimited=0, bad=x")
+    )
+    assert scheduler.company_budgets == {"big": 1000, "unlimited": 0}
+    for company in ("default", "big", "unlimited"):
+        meter.record("u", company, usage(500), 1.0)
+
+    with pytest.raises(BudgetExceeded):
+        scheduler.check_budget("default")
+    scheduler.check_budget("big")
+    scheduler.check_budget("unlimited")
+
+
+def test_limits_concurrent_slots():
+    scheduler = GenerationScheduler(UsageMeter(), max_concurrent=1, token_budget=0)
+    first, second = Holder(scheduler, "a"), Holder(scheduler, "b")
+    first.start()
+    assert first.admitted.wait(TIMEOUT)
+    second.start()
+    wait_until(lambda: queued(scheduler, 1))
+    assert not second.admitted.is_set()
+
+    first.release.set()
+    assert second.admitted.wait(TIMEOUT)
+    second.release.set()
+
+
+def test_wakes_every_waiter_a_freed_slot_can_admit():
+    # Whether the lower-priority waiter is woken first depends on thread
+    # scheduling, so repeat the scenario to make a lost wakeup show up
+    for _ in range(20):
+        meter = UsageMeter()
+        meter.record("c-user", "c", usage(1000), 1.0)
+        scheduler = GenerationScheduler(meter, max_concurrent=2, token_budget=0)
+        with scheduler._condition:
+            scheduler._active["a"] = 2
+
+        # c has used tokens, so b has priority once slots free up
+        c, b = Holder(scheduler, "c"), Holder(scheduler, "b")
+        c.start()
+        wait_until(lambda: queued(scheduler, 1))
+        b.start()
+        wait_until(lambda: queued(scheduler, 2))
+
+        # Both of a's generations finish before either waiter runs
+        with scheduler._condition:
+            del scheduler._active["a"]
+            scheduler._condition.notify_all()
+        assert b.admitted.wait(TIMEOUT)
+        assert c.admitted.wait(TIMEOUT), "c stayed queued while a slot was free"
+        b.release.set()
+        c.release.set()
+        b.join(TIMEOUT)
+        c.join(TIMEOUT)
+
+
+def test_least_served_company_goes_first():
+    meter = UsageMeter()
+    meter.record("heavy-user", "heavy", usage(1000), 1.0)
+    scheduler = GenerationScheduler(meter, max_concurrent=1, token_budget=0)
+    blocker = Holder(scheduler, "a")
+    blocker.start()
+    assert blocker.admitted.wait(TIMEOUT)
+
+    heavy, light = Holder(scheduler, "heavy"), Holder(scheduler, "light")
+    heavy.start()
+    wait_until(lambda: queued(scheduler, 1))
+    light.start()
+    wait_until(lambda: queued(scheduler, 2))
+
+    blocker.release.set()
+    assert light.admitted.wait(TIMEOUT)
+    assert not heavy.admitted.is_set()
+    light.release.set()
+    assert heavy.admitted.wait(TIMEOUT)
+    heavy.release.set()
+
+
+def test_budget_is_checked_before_and_after_queueing():
+    meter = UsageMeter()
+    scheduler = GenerationScheduler(meter, max_concurrent=1, token_budget=100)
+    meter.record("u", "spent", usage(100), 1.0)
+    with pytest.raises(BudgetExceeded):
+        with scheduler.slot("spent"):
+            pass
+
+    blocker = Holder(scheduler, "c")
+    blocker.start()
+    assert blocker.admitted.wait(TIMEOUT)
+    waiter = Holder(scheduler, "c")
+    waiter.start()
+    wait_until(lambda: queued(scheduler, 1))
+
+    # The running generation uses up the budget while the other one queues
+    meter.record("u", "c", usage(100), 1.0)
+    blocker.release.set()
+    assert waiter.admitted.wait(TIMEOUT)
+    assert isinstance(waiter.error, BudgetExceeded)
+    with scheduler._condition:
+        assert not scheduler._active and not scheduler._waiting
@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from utils import metering, prefetch
+from utils.metering import GenerationScheduler, UsageMeter
+from utils.models import CoreValue
+from utils.prefetch import QuestionPrefetcher, core_values_hash
+
+TIMEOUT = 2
+
+
+def core_values(count):
+    return [CoreValue(f"Value {i}", "Description") for i in range(count)]
+
+
+class StubGenerator:
+    """Stands in for generate_questions and records the core values it is called with."""
+
+    def __init__(self, result=None, error=None):
+        self.result = result if result is not None else (["question"], None)
+        self.error = error
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, core_values, num_questions=10, usage=None):
+        with self.lock:
+            self.calls.append([cv.name for cv in core_values])
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    stub = StubGenerator()
+    monkeypatch.setattr(prefetch, "generate_questions", stub)
+    monkeypatch.setattr(metering, "generate_questions", stub)
+    return stub
+
+
+def test_hash_changes_with_names_and_descriptions():
+    assert core_values_hash(core_values(2)) == core_values_hash(core_values(2))
+    assert core_values_hash(core_values(2)) != core_values_hash(core_values(3))
+    assert core_values_hash([CoreValue("A", "x")]) != core_values_hash([CoreValue("A", "y")])
+
+
+def test_take_returns_matching_prefetch(generator):
+    prefetcher = QuestionPrefetcher(debounce=0)
+    prefetcher.start("u", core_values(2), 10)
+    assert prefetcher.take("u", core_values(2), 10, timeout=TIMEOUT) == (["question"], None)
+    # A prefetch is handed out once
+    assert prefetcher.take("u", core_values(2), 10, timeout=TIMEOUT) is None
+
+
+def test_take_discards_stale_prefetch(generator):
+    prefetcher = QuestionPrefetcher(debounce=0.5)
+    prefetcher.start("u", core_values(2), 10)
+    assert prefetcher.take("u", core_values(3), 10) is None
+    assert prefetcher.take("u", core_values(2), 10) is None
+    time.sleep(0.7)
+    assert generator.calls == []
+
+
+def test_take_rejects_a_different_test_size(generator):
+    prefetcher = QuestionPrefetcher(debounce=0)
+    prefetcher.start("u", core_values(2), 10)
+    assert prefetcher.take("u", core_values(2), 15, timeout=TIMEOUT) is None
+
+
+def test_burst_of_saves_generates_once(generator):
+    prefetcher = QuestionPrefetcher(debounce=0.2)
+    for count in range(1, 6):
+        prefetcher.start("u", core_values(count), 10)
+    assert prefetcher.take("u", core_values(5), 10, timeout=TIMEOUT) == (["question"], None)
+    assert generator.calls == [[cv.name for cv in core_values(5)]]
+
+
+def test_same_inputs_do_not_restart(generator):
+    prefetcher = QuestionPrefetcher(debounce=0)
+    prefetcher.start("u", core_values(2), 10)
+    prefetcher.start("u", core_values(2), 10)
+    assert prefetcher.take("u", core_values(2), 10, timeout=TIMEOUT) == (["question"], None)
+    assert len(generator.calls) == 1
+
+
+def test_discard_before_debounce_skips_generation(generator):
+    prefetcher = QuestionPrefetcher(debounce=0.2)
+    prefetcher.start("u", core_values(2), 10)
+    prefetcher.discard("u")
+    time.sleep(0.4)
+    assert generator.calls == []
+
+
+def test_failed_prefetch_is_not_used(generator):
+    generator.error = RuntimeError("boom")
+    prefetcher = QuestionPrefetcher(debounce=0)
+    prefetcher.start("u", core_values(2), 10)
+    assert prefetcher.take("u", core_values(2), 10, timeout=TIMEOUT) is None
+
+
+def test_fallback_questions_are_not_used(generator):
+    generator.result = (["fallback"], "API Error")
+    prefetcher = QuestionPrefetcher(debounce=0)
+    prefetcher.start("u", core_values(2), 10)
+    assert prefetcher.take("u", core_values(2), 10, timeout=TIMEOUT) is None
+
+
+def test_prefetch_superseded_while_queued_releases_its_slot(generator):
+    scheduler = GenerationScheduler(UsageMeter(), max_concurrent=1, token_budget=0)
+    with scheduler._condition:
+        scheduler._active["other"] = 1
+    prefetcher = QuestionPrefetcher(scheduler=scheduler, debounce=0)
+
+    prefetcher.start("u", core_values(1), 10, company="c")
+    deadline = time.monotonic() + TIMEOUT
+    while not scheduler._waiting:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    prefetcher.start("u", core_values(2), 10, company="c")
+
+    with scheduler._condition:
+        del scheduler._active["other"]
+        scheduler._condition.notify_all()
+
+    assert prefetcher.take("u", core_values(2), 10, timeout=TIMEOUT) == (["question"], None)
+    assert generator.calls == [[cv.name for cv in core_values(2)]]
+    assert scheduler.meter.summary("c")["companies"][0]["calls"] == 1
@@ -0,0 +1,68 @@
+from utils.models import CoreValue
+from utils.question_synthesizer import DILEMMAS, SCORES, synthesize_questions
+
+CORE_VALUES = [
+    CoreValue("Integrity", "Do the right thing"),
+    CoreValue("Customer Obsession", "Start from the customer and work backwards"),
+    CoreValue("Ownership", ""),
+]
+
+
+def generated_questions(seeds=range(10), num_questions=20):
+    for seed in seeds:
+        yield from synthesize_questions(CORE_VALUES, num_questions, seed=seed)
+
+
+def best_option(question):
+    return max(question.options, key=lambda option: option.score)
+
+
+def test_questions_have_one_option_per_score():
+    questions = synthesize_questions(CORE_VALUES, 7, seed=1)
+    assert [q.id for q in questions] == list(range(1, 8))
+    for question in questions:
+        assert sorted(option.score for option in question.options) == sorted(SCORES)
+
+
+def test_seed_makes_output_reproducible():
+    assert synthesize_questions(CORE_VALUES, 5, seed=3) == synthesize_questions(CORE_VALUES, 5, seed=3)
+
+
+def test_options_have_similar_lengths():
+    for question in generated_questions():
+        lengths = [len(option.text) for option in question.options]
+        assert max(lengths) / min(lengths) <= 1.25, question
+
+
+def test_best_option_cannot_be_picked_by_length():
+    questions = list(generated_questions())
+    longest = sum(1 for q in questions if len(best_option(q).text) == max(len(o.text) for o in q.options))
+    shortest = sum(1 for q in questions if len(best_option(q).text) == min(len(o.text) for o in q.options))
+    # A quarter of each would be pure chance with four options
+    assert longest / len(questions) <= 0.4
+    assert shortest / len(questions) <= 0.4
+
+
+def test_best_option_is_not_the_only_one_naming_the_value():
+    for question in generated_questions():
+        value = question.core_values[0]
+        naming = [option for option in question.options if value in option.text]
+        assert len(naming) != 1, question
+
+
+def test_dilemma_templates_name_the_value_in_several_options_or_none():
+    for dilemma in DILEMMAS:
+        mentions = sum(1 for option in dilemma["options"] if "{value}" in option)
+        assert mentions != 1, dilemma["text"]
+
+
+def test_never_escalates_to_the_stakeholder_or_absent_manager():
+    covering = 0
+    for question in generated_questions(seeds=range(200)):
+        if "your manager" in question.text:
+            assert not any("your manager" in option.text for option in question.options), question
+        # A manager who is on leave can't also be the stakeholder
+        if question.text.startswith("While covering for your manager"):
+            covering += 1
+            assert question.text.count("your manager") == 1, question
+    assert covering
@@ -6,6 +6,8 @@ from datetime import datetime, timedelta
 import time
 import uuid
 
+from utils.models import CoreValue
+
 # Load environment variables
 load_dotenv()
 
@@ -19,9 +21,19 @@ FIREBASE_CONFIG = {
     "appId": "1:894079508319:web:8c7cc5a0389b87939d20ea"
 }
 
-# Firebase URLs
-FIREBASE_AUTH_URL = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_CONFIG['apiKey']}"
-FIREBASE_FIRESTORE_URL = f"https://firestore.googleapis.com/v1/projects/{FIREBASE_CONFIG['projectId']}/databases/(default)/documents"
+# Firebase URLs (the standard emulator variables redirect them to a local stand-in)
+FIREBASE_AUTH_EMULATOR_HOST = os.getenv("FIREBASE_AUTH_EMULATOR_HOST")
+FIRESTORE_EMULATOR_HOST = os.getenv("FIRESTORE_EMULATOR_HOST")
+
+if FIREBASE_AUTH_EMULATOR_HOST:
+    FIREBASE_AUTH_URL = f"http://{FIREBASE_AUTH_EMULATOR_HOST}/identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_CONFIG['apiKey']}"
+else:
+    FIREBASE_AUTH_URL = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_CONFIG['apiKey']}"
+
+if FIRESTORE_EMULATOR_HOST:
+    FIREBASE_FIRESTORE_URL = f"http://{FIRESTORE_EMULATOR_HOST}/v1/projects/{FIREBASE_CONFIG['projectId']}/databases/(default)/documents"
+else:
+    FIREBASE_FIRESTORE_URL = f"https://firestore.googleapis.com/v1/projects/{FIREBASE_CONFIG['projectId']}/databases/(default)/documents"
 
 # Authentication functions
 def login_user(email, password):
@@ -92,7 +104,7 @@ def save_core_values(user_id, core_values, id_token):
     
     Args:
         user_id (str): User ID
-        core_values (list): List of core values
+        core_values (list): List of CoreValue
         id_token (str): Firebase ID token
         
     Returns:
@@ -112,26 +124,7 @@ def save_core_values(user_id, core_values, id_token):
         }
         
         # Format core values for Firestore
-        values = []
-        for cv in core_values:
-            if isinstance(cv, dict):
-                values.append({
-                    "mapValue": {
-                        "fields": {
-                            "name": {"stringValue": cv.get("name", "")},
-                            "description": {"stringValue": cv.get("description", "")}
-                        }
-                    }
-                })
-            else:
-                values.append({
-                    "mapValue": {
-                        "fields": {
-                            "name": {"stringValue": str(cv)},
-                            "description": {"stringValue": ""}
-                        }
-                    }
-                })
+        values = [cv.to_firestore() for cv in core_values]
         
         # Set up request data
         data = {
@@ -176,7 +169,7 @@ def get_core_values(user_id, id_token):
         id_token (str): Firebase ID token
         
     Returns:
-        list: List of core values
+        list: List of CoreValue
     """
     try:
         # Get Firestore URL for core values
@@ -210,23 +203,10 @@ def get_core_values(user_id, id_token):
             print(f"Parsed JSON response: {json.dumps(data, indent=2)}")
             
             if "fields" in data and "values" in data["fields"]:
-                core_values = data["fields"]["values"]["arrayValue"]["values"]
-                # Convert each map value to a dictionary
-                result = []
-                for cv in core_values:
-                    if "mapValue" in cv:
-                        fields = cv["mapValue"]["fields"]
-                        result.append({
-                            "name": fields.get("name", {}).get("stringValue", ""),
-                            "description": fields.get("description", {}).get("stringValue", "")
-                        })
-                    else:
-                        # Handle legacy format or other formats
-                        result.append({
-                            "name": cv.get("stringValue", ""),
-                            "description": ""
-                        })
-                print(f"Processed core values: {json.dumps(result, indent=2)}")
+                core_values = data["fields"]["values"]["arrayValue"].get("values", [])
+                # Convert each map value (or legacy string value) to a CoreValue
+                result = [CoreValue.from_firestore(cv) for cv in core_values]
+                print(f"Processed core values: {json.dumps([cv.to_dict() for cv in result], indent=2)}")
                 return result
             print("No fields or values found in response")
             return []
@@ -263,16 +243,7 @@ def save_test(user_id, test_data, id_token):
                 "company": {"stringValue": test_data["company"]},
                 "core_values": {
                     "arrayValue": {
-                        "values": [
-                            {
-                                "mapValue": {
-                                    "fields": {
-                                        "name": {"stringValue": cv["name"]},
-                                        "description": {"stringValue": cv["description"]}
-                                    }
-                                }
-                            } for cv in test_data["core_values"]
-                        ]
+                        "values": [cv.to_firestore() for cv in test_data["core_values"]]
                     }
                 },
                 "created_at": {"timestampValue": datetime.now().isoformat() + "Z"},
@@ -280,29 +251,7 @@ def save_test(user_id, test_data, id_token):
                 "name": {"stringValue": test_data["name"]},
                 "questions": {
                     "arrayValue": {
-                        "values": [
-                            {
-                                "mapValue": {
-                                    "fields": {
-                                        "text": {"stringValue": q["text"]},
-                                        "options": {
-                                            "arrayValue": {
-                                                "values": [
-                                                    {
-                                                        "mapValue": {
-                                                            "fields": {
-                                                                "text": {"stringValue": opt["text"]},
-                                                                "score": {"integerValue": opt["score"]}
-                                                            }
-                                                        }
-                                                    } for opt in q["options"]
-                                                ]
-                                            }
-                                        }
-                                    }
-                                }
-                            } for q in test_data["questions"]
-                        ]
+                        "values": [q.to_firestore() for q in test_data["questions"]]
                     }
                 },
                 "start_date": {"timestampValue": datetime.now().isoformat() + "Z"},
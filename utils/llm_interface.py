@@ -1,24 +1,294 @@
 import os
 import json
+import time
+import socket
+import threading
 import requests
 import streamlit as st
-from typing import List, Dict, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Tuple, Optional
+
+from utils.models import CoreValue, Question, questions_from_llm
+from utils.question_synthesizer import synthesize_questions
 
 # Hugging Face API settings
-API_URL = "https://api-inference.huggingface.co/models/mistralai/Mixtral-8x7B-Instruct-v0.1"
+API_URL = os.getenv("HF_API_URL", "https://api-inference.huggingface.co/models/mistralai/Mixtral-8x7B-Instruct-v0.1")
 HEADERS = {
     "Authorization": f"Bearer {st.secrets['secrets']['HF_API_KEY']}"
 }
 
-def generate_questions(core_values: List[Dict[str, str]], num_questions: int = 10) -> Tuple[List[Dict[str, str]], Optional[str]]:
+# Hedged generation settings. The hedge goes to HF_HEDGE_API_URL (another model
+# or endpoint). Hedging is off unless that is set to something other than
+# API_URL, since a duplicate sent to the same slow or failing endpoint only
+# doubles the tokens charged.
+HEDGE_API_URL = os.getenv("HF_HEDGE_API_URL", "")
+HEDGE_ENABLED = (
+    os.getenv("HEDGE_REQUESTS", "true").lower() in ("1", "true", "yes")
+    and bool(HEDGE_API_URL) and HEDGE_API_URL != API_URL
+)
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "90"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "3"))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "30"))
+HEDGE_INITIAL_DELAY = float(os.getenv("HEDGE_INITIAL_DELAY", "15"))
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "90"))
+
+
+class LatencyHistogram:
+    """
+    Bucketed latency histogram used to pick the hedge delay for a backend.
+
+    Counts are halved once `max_samples` is reached so the percentile follows
+    recent behaviour rather than the whole process lifetime.
+    """
+
+    BUCKETS = [0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60, 90, 120]
+
+    def __init__(self, max_samples: int = 200, min_samples: int = 10):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            index = next((i for i, bound in enumerate(self.BUCKETS) if seconds <= bound), len(self.BUCKETS))
+            self.counts[index] += 1
+            self.total += 1
+            if self.total >= self.max_samples:
+                self.counts = [count // 2 for count in self.counts]
+                self.total = sum(self.counts)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given percentile, or None without enough samples."""
+        with self._lock:
+            if self.total < self.min_samples:
+                return None
+            threshold = self.total * pct / 100
+            cumulative = 0
+            for i, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= threshold:
+                    return self.BUCKETS[min(i, len(self.BUCKETS) - 1)]
+            return self.BUCKETS[-1]
+
+
+class Backend:
+    """An inference endpoint with its own latency histogram."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.latency = LatencyHistogram()
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for this backend before sending a hedge request."""
+        delay = self.latency.percentile(HEDGE_PERCENTILE)
+        if delay is None:
+            delay = HEDGE_INITIAL_DELAY
+        return min(max(delay, HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+
+PRIMARY_BACKEND = Backend("primary", API_URL)
+HEDGE_BACKEND = Backend("hedge", HEDGE_API_URL or API_URL)
+
+
+class RequestCancelled(requests.RequestException):
+    """Raised by a request that was aborted because another backend answered first."""
+
+
+class CancellableAdapter(requests.adapters.HTTPAdapter):
+    """
+    Transport adapter whose in-flight requests can be aborted from another thread.
+
+    requests has no cancellation API, and closing a Session does not interrupt
+    a call blocked waiting for the response. The adapter keeps track of the
+    connections it opens, and `cancel()` shuts their sockets down so the
+    blocked call fails straight away and releases its thread.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        super().__init__(max_retries=0)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        adapter = self
+
+        def tracked(connection_class):
+            class TrackedConnection(connection_class):
+                def connect(self):
+                    super().connect()
+                    adapter._track(self)
+            return TrackedConnection
+
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(pool_class.__name__, (pool_class,), {"ConnectionCls": tracked(pool_class.ConnectionCls)})
+            for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+    def _track(self, connection):
+        with self._connections_lock:
+            self._connections.append(connection)
+        # A request cancelled while it was still connecting is aborted here
+        if self.cancelled.is_set():
+            self._shutdown(connection)
+
+    @staticmethod
+    def _shutdown(connection):
+        sock = getattr(connection, "sock", None)
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def cancel(self):
+        """Abort every request in flight on this adapter."""
+        self.cancelled.set()
+        with self._connections_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            self._shutdown(connection)
+
+
+def _cancellable_session():
+    session = requests.Session()
+    adapter = CancellableAdapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session, adapter
+
+
+def _call_backend(backend: Backend, prompt: str, session: requests.Session, usage=None) -> List[Question]:
+    """
+    Send the prompt to one backend and parse the questions it returns.
+
+    Raises:
+        ValueError: If the backend answers with an error, unparseable JSON or malformed questions
+        RequestCancelled: If the request was aborted through the session's CancellableAdapter
+        requests.RequestException: On connection errors and timeouts
+    """
+    adapter = session.get_adapter(backend.url)
+    if usage:
+        usage.add_request(prompt)
+    start = time.perf_counter()
+    try:
+        response = session.post(
+            backend.url,
+            headers=HEADERS,
+            json={
+                "inputs": prompt,
+                "parameters": {
+                    "temperature": 0.7,
+                    "max_new_tokens": 2000,
+                    "return_full_text": False
+                }
+            },
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+        )
+    except requests.RequestException as e:
+        # An aborted request says nothing about how long the backend would have taken
+        if getattr(adapter, "cancelled", None) is not None and adapter.cancelled.is_set():
+            raise RequestCancelled(f"{backend.name} request cancelled") from e
+        # Timeouts are the tail we hedge against, so they count towards the histogram
+        if isinstance(e, requests.Timeout):
+            backend.latency.record(time.perf_counter() - start)
+        raise
+    backend.latency.record(time.perf_counter() - start)
+
+    if response.status_code != 200:
+        raise ValueError(f"API Error: {response.text}")
+
+    response_text = ""
+    try:
+        response_text = response.json()[0]['generated_text']
+        if usage:
+            usage.add_response(response_text)
+        return questions_from_llm(json.loads(response_text.strip()))
+    except (json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+        raise ValueError(f"JSON parsing failed: {str(e)}. Response: {response_text[:200]}...")
+
+
+def _hedged_call(prompt: str, usage=None) -> List[Question]:
+    """
+    Call the primary backend and hedge to the alternate one if it is slow.
+
+    The hedge is sent once the primary has been outstanding for longer than its
+    percentile-based hedge delay, or straight away if the primary fails. The
+    first valid response wins and the other request is aborted by shutting
+    down its socket, so it stops holding a thread as soon as the winner
+    returns. Each call runs its requests on its own two threads, so a slow
+    request can never delay another generation's hedge.
+
+    The winner is returned without waiting for the loser to unwind. The
+    loser's prompt tokens are added to `usage` when it is sent; the output of
+    an aborted request is never received and so not counted.
+
+    Raises:
+        Exception: The last error if no backend returned valid questions
+    """
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm")
+    sessions = {}
+    futures = {}
+
+    def submit(backend):
+        session, adapter = _cancellable_session()
+        sessions[backend.name] = (session, adapter)
+        futures[executor.submit(_call_backend, backend, prompt, session, usage)] = backend
+
+    submit(PRIMARY_BACKEND)
+    hedge_deadline = time.monotonic() + PRIMARY_BACKEND.hedge_delay()
+    last_error = None
+    try:
+        while futures:
+            hedged = HEDGE_BACKEND.name in sessions
+            timeout = None if hedged or not HEDGE_ENABLED else max(0, hedge_deadline - time.monotonic())
+            done, _ = wait(list(futures), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                backend = futures.pop(future)
+                try:
+                    questions = future.result()
+                    print(f"Questions generated by {backend.name} backend")
+                    return questions
+                except Exception as e:
+                    print(f"{backend.name} backend failed: {e}")
+                    last_error = e
+
+            if HEDGE_ENABLED and not hedged and (not futures or time.monotonic() >= hedge_deadline):
+                print(f"Hedging generation request to {HEDGE_BACKEND.url}")
+                submit(HEDGE_BACKEND)
+        raise last_error
+    finally:
+        pending = {backend.name for backend in futures.values()}
+        for future in futures:
+            future.cancel()
+        for name, (session, adapter) in sessions.items():
+            adapter.cancel()
+            if name not in pending:
+                session.close()
+        # Sessions still in use are closed once their aborted request unwinds,
+        # without holding up the winner
+        for future, backend in futures.items():
+            future.add_done_callback(lambda _, session=sessions[backend.name][0]: session.close())
+        executor.shutdown(wait=False)
+
+
+def generate_questions(core_values: List[CoreValue], num_questions: int = 10, usage=None) -> Tuple[List[Question], Optional[str]]:
     """
     Generate questions using Hugging Face's Inference API
     Returns a tuple of (questions, error_message)
+    If `usage` (a metering.CallUsage) is given, every request's tokens are added to it
     """
     try:
         num_questions = int(num_questions)
         core_values_text = "\n".join([
-            f"- {cv['name']}: {cv['description']}"
+            f"- {cv.name}: {cv.description}"
             for cv in core_values
         ])
 
@@ -46,69 +316,20 @@ Generate {num_questions} multiple-choice questions with these requirements:
 ][/INST]
 </s>"""
 
-        # Call Hugging Face API
-        response = requests.post(
-            API_URL,
-            headers=HEADERS,
-            json={
-                "inputs": prompt,
-                "parameters": {
-                    "temperature": 0.7,
-                    "max_new_tokens": 2000,
-                    "return_full_text": False
-                }
-            }
-        )
-
-        if response.status_code != 200:
-            return create_sample_questions(core_values, num_questions), f"API Error: {response.text}"
-
-        # Try to extract valid JSON
+        # Call Hugging Face API, hedging to the alternate backend on slow responses
         try:
-            response_text = response.json()[0]['generated_text']
-            questions = json.loads(response_text.strip())
+            questions = _hedged_call(prompt, usage)
             return questions, None
-        except (json.JSONDecodeError, KeyError) as e:
-            error_msg = f"JSON parsing failed: {str(e)}. Response: {response_text[:200]}..."
-            return create_sample_questions(core_values, num_questions), error_msg
+        except (ValueError, requests.RequestException) as e:
+            return create_sample_questions(core_values, num_questions), str(e)
             
     except Exception as e:
         error_msg = f"Error generating questions: {str(e)}"
         return create_sample_questions(core_values, num_questions), error_msg
 
-# Keep create_sample_questions() function the same as before
-
-def create_sample_questions(core_values, num_questions):
+def create_sample_questions(core_values: List[CoreValue], num_questions: int) -> List[Question]:
     """
-    Create sample questions based on core values.
+    Create scenario questions from the offline template bank.
     This is a fallback function used when AI generation fails.
     """
-    # Ensure num_questions is an integer
-    num_questions = int(num_questions)
-    
-    # Create sample questions
-    questions = []
-    for i in range(num_questions):
-        # Get a core value (cycle through them if needed)
-        core_value = core_values[i % len(core_values)]
-        
-        # Extract core value name
-        if isinstance(core_value, dict):
-            core_value_name = core_value.get('name', 'Unknown')
-        else:
-            core_value_name = str(core_value)
-        
-        question = {
-            "id": i + 1,
-            "text": f"Sample question {i+1} about {core_value_name}?",
-            "core_values": [core_value_name],
-            "options": [
-                {"text": "Option A", "score": 8},
-                {"text": "Option B", "score": 6},
-                {"text": "Option C", "score": 4},
-                {"text": "Option D", "score": 2}
-            ]
-        }
-        questions.append(question)
-    
-    return questions 
+    return synthesize_questions(core_values, num_questions)
@@ -0,0 +1,262 @@
+import os
+import time
+import threading
+import itertools
+from collections import deque
+from contextlib import contextmanager
+
+from utils.llm_interface import generate_questions, create_sample_questions
+
+# Per-company token budget over a rolling window (0 disables the budget)
+TOKEN_BUDGET = int(os.getenv("GENERATION_TOKEN_BUDGET", "0"))
+# Per-company overrides of TOKEN_BUDGET as "company_id=tokens,other_id=tokens"
+COMPANY_TOKEN_BUDGETS = os.getenv("GENERATION_COMPANY_TOKEN_BUDGETS", "")
+BUDGET_WINDOW_SECONDS = float(os.getenv("GENERATION_BUDGET_WINDOW_HOURS", "24")) * 3600
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "4"))
+
+# Rough characters-per-token ratio for the Mixtral tokenizer on English text
+CHARS_PER_TOKEN = 4
+
+
+def parse_budgets(spec):
+    """
+    Parse per-company token budgets.
+
+    Args:
+        spec (str): Comma separated "company_id=tokens" entries
+
+    Returns:
+        dict: Company ID -> token budget (0 means unlimited)
+    """
+    budgets = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        company, _, tokens = entry.rpartition("=")
+        try:
+            budgets[company.strip()] = int(tokens)
+        except ValueError:
+            print(f"Ignoring invalid company token budget: {entry!r}")
+    return budgets
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a piece of text."""
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class CallUsage:
+    """
+    Token counts for one generation, shared by all the requests it sends.
+
+    Hedged generations send the prompt to two backends, so both count.
+    """
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def add_request(self, prompt):
+        with self._lock:
+            self.input_tokens += estimate_tokens(prompt)
+            self.requests += 1
+
+    def add_response(self, text):
+        with self._lock:
+            self.output_tokens += estimate_tokens(text)
+
+    @property
+    def total_tokens(self):
+        return self.input_tokens + self.output_tokens
+
+
+class UsageMeter:
+    """
+    Aggregates generation usage per user and per company.
+
+    Companies are keyed by a stable ID; the display name is only a label, so
+    two companies with the same name never share totals or a budget.
+    """
+
+    def __init__(self, window_seconds=BUDGET_WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._users = {}
+        self._companies = {}
+        self._recent = {}
+
+    def record(self, user_id, company, usage, seconds, company_name=None):
+        """
+        Record one generation.
+
+        Args:
+            user_id (str): User who requested the generation
+            company (str): ID of the company the user belongs to
+            usage (CallUsage): Token counts for the generation
+            seconds (float): Wall time of the generation
+            company_name (str): Display name shown for the company
+        """
+        now = time.time()
+        with self._lock:
+            for key, table in ((user_id, self._users), (company, self._companies)):
+                totals = table.setdefault(key, {
+                    "company": company, "calls": 0, "requests": 0,
+                    "input_tokens": 0, "output_tokens": 0, "seconds": 0.0
+                })
+                if table is self._companies:
+                    totals["name"] = company_name or totals.get("name") or company
+                totals["calls"] += 1
+                totals["requests"] += usage.requests
+                totals["input_tokens"] += usage.input_tokens
+                totals["output_tokens"] += usage.output_tokens
+                totals["seconds"] += seconds
+            self._recent.setdefault(company, deque()).append((now, usage.total_tokens))
+
+    def tokens_in_window(self, company):
+        """Tokens a company has used within the budget window."""
+        cutoff = time.time() - self.window_seconds
+        with self._lock:
+            recent = self._recent.get(company)
+            if not recent:
+                return 0
+            while recent and recent[0][0] < cutoff:
+                recent.popleft()
+            return sum(tokens for _, tokens in recent)
+
+    def summary(self, company=None):
+        """
+        Usage totals, optionally limited to one company ID.
+
+        Returns:
+            dict: {"companies": [...], "users": [...]} lists of row dicts
+        """
+        with self._lock:
+            companies = [
+                {"company": key, **{k: v for k, v in totals.items() if k != "company"}}
+                for key, totals in self._companies.items()
+                if company is None or key == company
+            ]
+            users = [
+                {"user_id": key, **totals}
+                for key, totals in self._users.items()
+                if company is None or totals["company"] == company
+            ]
+        for company_row in companies:
+            company_row["tokens_in_window"] = self.tokens_in_window(company_row["company"])
+        return {"companies": companies, "users": users}
+
+
+class BudgetExceeded(Exception):
+    """Raised when a company has used up its token budget for the window."""
+
+
+class GenerationScheduler:
+    """
+    Limits concurrent generations and shares the slots fairly between companies.
+
+    When every slot is busy, the next free slot goes to the waiting company
+    with the fewest generations in flight, then the fewest tokens used in the
+    budget window, then the earliest arrival. A company spamming "Generate
+    Test" therefore queues behind everyone else rather than in front of them.
+    """
+
+    def __init__(self, meter, max_concurrent=MAX_CONCURRENT_GENERATIONS, token_budget=TOKEN_BUDGET,
+                 company_budgets=None):
+        self.meter = meter
+        self.max_concurrent = max_concurrent
+        self.token_budget = token_budget
+        if company_budgets is None:
+            company_budgets = parse_budgets(COMPANY_TOKEN_BUDGETS)
+        self.company_budgets = company_budgets
+        self._condition = threading.Condition()
+        self._active = {}
+        self._waiting = []
+        self._sequence = itertools.count()
+
+    def budget_for(self, company):
+        """Token budget for a company: its own override, else the default (0 means unlimited)."""
+        return self.company_budgets.get(company, self.token_budget)
+
+    def check_budget(self, company):
+        """
+        Raises:
+            BudgetExceeded: If the company has no budget left in the window
+        """
+        budget = self.budget_for(company)
+        if budget and self.meter.tokens_in_window(company) >= budget:
+            raise BudgetExceeded(f"Token budget of {budget} exhausted for {company}")
+
+    def _priority(self, waiter):
+        company, sequence = waiter
+        return (self._active.get(company, 0), self.meter.tokens_in_window(company), sequence)
+
+    @contextmanager
+    def slot(self, company):
+        """Wait for a generation slot, giving priority to the least served company."""
+        self.check_budget(company)
+        waiter = (company, next(self._sequence))
+        with self._condition:
+            self._waiting.append(waiter)
+            try:
+                while (sum(self._active.values()) >= self.max_concurrent
+                       or min(self._waiting, key=self._priority) != waiter):
+                    self._condition.wait()
+            finally:
+                self._waiting.remove(waiter)
+            # Generations that finished while this one queued may have used up the budget
+            try:
+                self.check_budget(company)
+            except BudgetExceeded:
+                self._condition.notify_all()
+                raise
+            self._active[company] = self._active.get(company, 0) + 1
+            # Waiters that woke while this one had priority went back to sleep;
+            # wake them again in case another slot is still free
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active[company] -= 1
+                if not self._active[company]:
+                    del self._active[company]
+                self._condition.notify_all()
+
+
+def metered_generate_questions(scheduler, user_id, company, core_values, num_questions,
+                               company_name=None, cancelled=None):
+    """
+    Generate questions within the company's budget and a fair-share slot.
+
+    When the budget is exhausted the offline questions are returned instead,
+    with an error message, as for any other generation failure.
+
+    Args:
+        company (str): Stable company ID the generation is charged to (defaults to the user ID)
+        company_name (str): Display name recorded alongside the usage
+        cancelled (threading.Event): Optional flag checked once a slot is granted;
+            if set, the slot is released without calling the LLM
+
+    Returns:
+        tuple: (questions, error_message), or None if cancelled
+    """
+    company = company or user_id
+    try:
+        with scheduler.slot(company):
+            if cancelled is not None and cancelled.is_set():
+                return None
+            usage = CallUsage()
+            start = time.perf_counter()
+            try:
+                return generate_questions(core_values, num_questions, usage=usage)
+            finally:
+                seconds = time.perf_counter() - start
+                scheduler.meter.record(user_id, company, usage, seconds, company_name=company_name)
+                print(f"Generation for {company}/{user_id}: {usage.input_tokens} input tokens, "
+                      f"{usage.output_tokens} output tokens, {seconds:.1f}s")
+    except BudgetExceeded as e:
+        return create_sample_questions(core_values, num_questions), str(e)
@@ -0,0 +1,142 @@
+from typing import NamedTuple, Tuple, List, Dict, Any
+
+
+class CoreValue(NamedTuple):
+    """A company core value."""
+
+    name: str
+    description: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "CoreValue":
+        """Build from a {"name", "description"} dict; anything else is taken as the name."""
+        if isinstance(data, dict):
+            return cls(str(data.get("name", "")), str(data.get("description", "")))
+        return cls(str(data))
+
+    @classmethod
+    def from_firestore(cls, value: Dict[str, Any]) -> "CoreValue":
+        """Build from a Firestore mapValue, or a legacy stringValue holding only the name."""
+        if "mapValue" in value:
+            fields = value["mapValue"].get("fields", {})
+            return cls(
+                fields.get("name", {}).get("stringValue", ""),
+                fields.get("description", {}).get("stringValue", "")
+            )
+        return cls(value.get("stringValue", ""))
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"name": self.name, "description": self.description}
+
+    def to_firestore(self) -> Dict[str, Any]:
+        return {
+            "mapValue": {
+                "fields": {
+                    "name": {"stringValue": self.name},
+                    "description": {"stringValue": self.description}
+                }
+            }
+        }
+
+
+class Option(NamedTuple):
+    """An answer option and the score it is worth."""
+
+    text: str
+    score: int
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Option":
+        """
+        Build from LLM JSON.
+
+        Raises:
+            ValueError: If the text or score is missing or the score is not an integer
+        """
+        try:
+            return cls(str(data["text"]), int(data["score"]))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid option {data!r}: {e}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "score": self.score}
+
+    def to_firestore(self) -> Dict[str, Any]:
+        return {
+            "mapValue": {
+                "fields": {
+                    "text": {"stringValue": self.text},
+                    "score": {"integerValue": self.score}
+                }
+            }
+        }
+
+
+class Question(NamedTuple):
+    """A multiple-choice question about one or more core values."""
+
+    id: int
+    text: str
+    core_values: Tuple[str, ...]
+    options: Tuple[Option, ...]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], default_id: int = 0) -> "Question":
+        """
+        Build from LLM JSON, validating the whole question once.
+
+        Raises:
+            ValueError: If the question text or options are missing or malformed
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"Invalid question {data!r}")
+        try:
+            options = data["options"]
+            if not isinstance(options, list) or not options:
+                raise ValueError("no options")
+            core_values = data.get("core_values") or []
+            if isinstance(core_values, str):
+                core_values = [core_values]
+            return cls(
+                int(data.get("id", default_id)),
+                str(data["text"]),
+                tuple(str(name) for name in core_values),
+                tuple(Option.from_dict(option) for option in options)
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid question {data!r}: {e}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "text": self.text,
+            "core_values": list(self.core_values),
+            "options": [option.to_dict() for option in self.options]
+        }
+
+    def to_firestore(self) -> Dict[str, Any]:
+        """Firestore mapValue in the saved-test layout, which stores only the text and options."""
+        return {
+            "mapValue": {
+                "fields": {
+                    "text": {"stringValue": self.text},
+                    "options": {
+                        "arrayValue": {
+                            "values": [option.to_firestore() for option in self.options]
+                        }
+                    }
+                }
+            }
+        }
+
+
+def questions_from_llm(data: Any) -> List[Question]:
+    """
+    Validate a parsed LLM response and convert it to questions.
+
+    Raises:
+        ValueError: If the response is not a non-empty list of valid questions
+    """
+    if not isinstance(data, list) or not data:
+        raise ValueError("Expected a non-empty JSON array of questions")
+    return [Question.from_dict(item, default_id=i + 1) for i, item in enumerate(data)]
@@ -0,0 +1,142 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.llm_interface import generate_questions
+from utils.metering import metered_generate_questions
+
+# Test size pre-generated when core values are saved (the default on the generation page)
+DEFAULT_NUM_QUESTIONS = 10
+
+# Seconds to wait before prefetching, so a burst of saves only generates once
+PREFETCH_DEBOUNCE = float(os.getenv("PREFETCH_DEBOUNCE", "2"))
+
+
+def core_values_hash(core_values):
+    """
+    Hash core values so prefetched questions can be matched to their inputs.
+
+    Args:
+        core_values (list): List of CoreValue
+
+    Returns:
+        str: Hex digest that only changes when a name or description changes
+    """
+    return hashlib.sha256(json.dumps([tuple(cv) for cv in core_values]).encode("utf-8")).hexdigest()
+
+
+class QuestionPrefetcher:
+    """
+    Starts question generation in the background as soon as core values are saved.
+
+    Each user has at most one prefetch in flight. Starting a new one for the
+    same user cancels the previous one, and a prefetch is only handed out when
+    the core values and test size match the ones it was started with.
+
+    A running task cannot be interrupted mid-request, so each prefetch waits
+    out a short debounce and checks it is still wanted before and after
+    queueing for a generation slot. A superseded prefetch therefore never
+    reaches the LLM unless it was already generating.
+    """
+
+    def __init__(self, max_workers=4, scheduler=None, debounce=PREFETCH_DEBOUNCE):
+        self._scheduler = scheduler
+        self._debounce = debounce
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _generate(self, user_id, core_values, num_questions, company, company_name, cancelled):
+        if cancelled.wait(self._debounce):
+            return None
+        if self._scheduler:
+            return metered_generate_questions(
+                self._scheduler, user_id, company, core_values, num_questions,
+                company_name=company_name, cancelled=cancelled
+            )
+        return generate_questions(core_values, num_questions)
+
+    @staticmethod
+    def _cancel(entry):
+        entry[1].cancel()
+        entry[2].set()
+
+    def start(self, user_id, core_values, num_questions=DEFAULT_NUM_QUESTIONS, company=None, company_name=None):
+        """
+        Start generating questions for a user in the background.
+
+        Args:
+            user_id (str): User ID
+            core_values (list): List of core values
+            num_questions (int): Number of questions to pre-generate
+            company (str): ID of the company charged for the generation when metered
+            company_name (str): Display name recorded with the usage
+        """
+        if not core_values:
+            self.discard(user_id)
+            return
+
+        key = (core_values_hash(core_values), int(num_questions))
+        with self._lock:
+            current = self._entries.get(user_id)
+            if current and current[0] == key:
+                return
+            if current:
+                self._cancel(current)
+            cancelled = threading.Event()
+            future = self._executor.submit(
+                self._generate, user_id, list(core_values), num_questions, company, company_name, cancelled
+            )
+            self._entries[user_id] = (key, future, cancelled)
+        print(f"Prefetching {num_questions} questions for user {user_id}")
+
+    def take(self, user_id, core_values, num_questions, timeout=None):
+        """
+        Hand out the prefetched questions if they match the given inputs.
+
+        A matching prefetch that is still running is waited on rather than
+        restarted. Mismatched or failed prefetches are discarded.
+
+        Args:
+            user_id (str): User ID
+            core_values (list): List of core values the test is generated for
+            num_questions (int): Number of questions requested
+            timeout (float): Seconds to wait for a running prefetch
+
+        Returns:
+            tuple: (questions, None) if a usable prefetch exists, None otherwise
+        """
+        key = (core_values_hash(core_values), int(num_questions))
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+
+        if not entry:
+            return None
+        if entry[0] != key:
+            self._cancel(entry)
+            print(f"Discarding stale prefetch for user {user_id}")
+            return None
+
+        try:
+            result = entry[1].result(timeout=timeout)
+        except Exception as e:
+            print(f"Prefetch failed for user {user_id}: {e}")
+            return None
+        if not result:
+            return None
+
+        questions, error_msg = result
+
+        # A failed call returns fallback questions, so let the caller retry live instead
+        if error_msg or not questions:
+            return None
+        return questions, None
+
+    def discard(self, user_id):
+        """Cancel and forget any prefetch for a user."""
+        with self._lock:
+            entry = self._entries.pop(user_id, None)
+        if entry:
+            self._cancel(entry)
@@ -0,0 +1,191 @@
+import random
+from typing import List
+
+from utils.models import CoreValue, Question, Option
+
+# Template bank used to build scenario questions without calling the LLM.
+# Placeholders: {value} is the core value name, {stakeholder} comes from STAKEHOLDERS.
+SITUATIONS = [
+    "Two days before a major client delivery",
+    "During a quarterly planning meeting",
+    "While onboarding a new member of your team",
+    "Halfway through a cross-team project",
+    "Shortly after a customer escalation lands on your desk",
+    "While reviewing a colleague's work before it ships",
+    "During a tight budget review",
+    "While covering for your manager who is on leave",
+    "At the start of a reorganisation that affects your team",
+    "In the final week of a product launch",
+]
+
+STAKEHOLDERS = [
+    "a senior colleague",
+    "a long-standing customer",
+    "your manager",
+    "a new hire on your team",
+    "the lead of a partner team",
+    "an external vendor",
+    "a peer who is under pressure",
+    "a director from another department",
+]
+
+# Stakeholders a situation rules out, e.g. a manager who is on leave can't ask for anything
+SITUATION_EXCLUDES = {
+    "While covering for your manager who is on leave": ("your manager",),
+}
+
+# Each dilemma lists its options from the best (8) to the weakest (2) expression
+# of the core value. Options are shuffled per question, so they are written to
+# be of similar length, and {value} appears in several options or in none, so
+# the best answer can't be spotted by its length or by naming the value.
+# {escalation} is who the respondent would escalate to (see ESCALATION).
+DILEMMAS = [
+    {
+        "text": "{stakeholder} suggests a shortcut that would save time but sits uneasily with {value}.",
+        "options": [
+            "Explain your concern with the shortcut and suggest another route that still meets the deadline",
+            "Turn the shortcut down and quietly take on the extra work yourself so the deadline holds",
+            "Accept the shortcut this once and raise your concerns properly at the next retrospective",
+            "Go along with it, since they probably have more context on the priorities than you do",
+        ],
+    },
+    {
+        "text": "{stakeholder} disagrees openly with a decision you made that you believe reflects {value}.",
+        "options": [
+            "Meet them to understand their view, then revisit the decision together against {value}",
+            "Walk them through your reasoning in detail and explain how the decision reflects {value}",
+            "Ask {escalation} to weigh in before the two of you discuss the decision any further",
+            "Adjust the decision to avoid further friction so the team can move on with the work",
+        ],
+    },
+    {
+        "text": "You notice that a commitment made to {stakeholder} will slip, and nobody has told them yet.",
+        "options": [
+            "Tell them now, explain the impact and agree a new plan together with them",
+            "Work extra hours to try to recover the date before you say anything to them",
+            "Flag the risk to {escalation} and let them decide how best to communicate it",
+            "Wait until the slip is certain so that you only have to deliver the news once",
+        ],
+    },
+    {
+        "text": "{stakeholder} asks for your help on something outside your goals at a time when your own work is behind.",
+        "options": [
+            "Agree what help matters most, timebox it and openly reshuffle your priorities",
+            "Help them fully now and catch up on your own work over the coming weekend instead",
+            "Point them to the documentation or to someone else who might have more time",
+            "Explain that your own targets have to come first for the rest of this quarter",
+        ],
+    },
+    {
+        "text": "A process your team follows is slowing everyone down, and {stakeholder} wants to keep it as it is.",
+        "options": [
+            "Propose a short, time-boxed experiment with the process and review it with the team",
+            "Improve the process for your own work first and share what you learned afterwards",
+            "Raise the issue at the next team meeting and let the group decide what to do about it",
+            "Keep following the process as it is, since changing it is not really your call to make",
+        ],
+    },
+    {
+        "text": "You discover a mistake in work you delivered to {stakeholder} last month that nobody has noticed.",
+        "options": [
+            "Tell them straight away, explain the impact and share your plan to put it right",
+            "Fix the mistake quietly in the next update and note the change in the release log",
+            "Mention it to {escalation} and ask how they would like you to handle the situation",
+            "Leave it for now, since it has not caused any visible problems for anyone so far",
+        ],
+    },
+    {
+        "text": "{stakeholder} is struggling visibly, and it is starting to affect a shared deadline.",
+        "options": [
+            "Check in with them privately, offer help and agree how to protect the deadline",
+            "Take over their part of the work yourself so that the shared deadline is still met",
+            "Let {escalation} know what you have noticed so that they can step in and help out",
+            "Focus on your own part and trust that they will ask for help when they need it",
+        ],
+    },
+    {
+        "text": "You have an idea that could improve results for {stakeholder}, but it means challenging a plan that is already approved.",
+        "options": [
+            "Build a quick prototype, show the evidence and invite feedback before it is locked in",
+            "Write up the idea for the decision makers and let them choose whether to act on it",
+            "Keep the idea for the next planning cycle, when changes to the plan are easier to make",
+            "Deliver the approved plan as agreed, since reopening it now would cause further delays",
+        ],
+    },
+]
+
+# Who options escalate to, unless the situation or stakeholder already is that person
+ESCALATION = "your manager"
+ESCALATION_FALLBACK = "your skip-level manager"
+
+SCORES = (8, 6, 4, 2)
+MAX_DESCRIPTION_LENGTH = 120
+
+
+def _describe(core_value: CoreValue) -> str:
+    description = core_value.description.strip().rstrip(".")
+    if not description:
+        return f"With {core_value.name} in mind, what do you do?"
+    if len(description) > MAX_DESCRIPTION_LENGTH:
+        description = description[:MAX_DESCRIPTION_LENGTH].rsplit(" ", 1)[0] + "..."
+    return f'With {core_value.name} in mind ("{description}"), what do you do?'
+
+
+def synthesize_questions(core_values: List[CoreValue], num_questions: int, seed: int = None) -> List[Question]:
+    """
+    Build scenario questions from the template bank without any network calls.
+
+    Core values are cycled so each gets an equal share of questions.
+    Situations, stakeholders and dilemmas are drawn in a shuffled rotation,
+    and each question has four options scored 8, 6, 4 and 2 in random order.
+
+    Args:
+        core_values (list): List of CoreValue
+        num_questions (int): Number of questions to create
+        seed (int): Optional seed for reproducible output
+
+    Returns:
+        list: List of Question
+    """
+    num_questions = int(num_questions)
+    rng = random.Random(seed)
+    situations = rng.sample(SITUATIONS, len(SITUATIONS))
+    stakeholders = rng.sample(STAKEHOLDERS, len(STAKEHOLDERS))
+    dilemmas = rng.sample(DILEMMAS, len(DILEMMAS))
+
+    questions = []
+    for i in range(num_questions):
+        core_value = core_values[i % len(core_values)]
+        situation = situations[i % len(situations)]
+        stakeholder = stakeholders[i % len(stakeholders)]
+        # Move on through the rotation past stakeholders the situation rules out
+        excluded = SITUATION_EXCLUDES.get(situation, ())
+        offset = 0
+        while stakeholder in excluded and offset < len(stakeholders):
+            offset += 1
+            stakeholder = stakeholders[(i + offset) % len(stakeholders)]
+        # Offset the dilemma each time the stakeholders wrap so combinations don't repeat
+        dilemma = dilemmas[(i + i // len(stakeholders)) % len(dilemmas)]
+
+        escalation = ESCALATION
+        if ESCALATION in stakeholder or ESCALATION in situation:
+            escalation = ESCALATION_FALLBACK
+
+        fill = {"value": core_value.name, "stakeholder": stakeholder, "escalation": escalation}
+        dilemma_text = dilemma["text"].format(**fill)
+        text = f"{situation}, {dilemma_text[0].lower()}{dilemma_text[1:]} {_describe(core_value)}"
+
+        options = [
+            Option(template.format(**fill), score)
+            for template, score in zip(dilemma["options"], SCORES)
+        ]
+        rng.shuffle(options)
+
+        questions.append(Question(
+            id=i + 1,
+            text=text,
+            core_values=(core_value.name,),
+            options=tuple(options)
+        ))
+
+    return questions